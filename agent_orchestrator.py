@@ -3,15 +3,15 @@ from typing import Annotated
 from dotenv import load_dotenv
 from langchain_core.tools import tool
 # from langgraph.prebuilt import create_react_agent
-from langchain.agents import create_agent
+from langchain.agents import create_agent as build_agent
 import prompt
-from retrieval_pipeline import RetrievalPipeline
-from prompt import rag_prompt
+from retrieval_pipeline import get_pipeline
+from prompt import RAG_PROMPT_TEXT
 
 load_dotenv()
 
-# Initialize retrieval pipeline
-retrieval_pipeline = RetrievalPipeline()
+# Agent is built once and reused across queries
+_agent = None
 
 
 @tool
@@ -26,28 +26,29 @@ def retrieve_cloud_optimization_info(query: Annotated[str, "The cloud cost optim
     - Cost reduction strategies
     - FinOps best practices
     """
-    results = retrieval_pipeline.retrieve(query, top_k=3)
+    results = get_pipeline().retrieve(query, top_k=3, use_reranking=False)
     
     context_parts = []
-    for i, result in enumerate(results, 1):
-        source = result['metadata']['source']
-        provider = result['metadata']['provider']
-        content = result['content'][:500]
+    for i, (content, metadata) in enumerate(zip(results.contents, results.metadatas), 1):
+        source = metadata['source']
+        provider = metadata['provider']
+        content = content[:500]
         context_parts.append(f"[Source {i}: {source} - {provider}]\n{content}")
     
     return "\n\n".join(context_parts)
 
 
 def create_agent():
-    """Create ReAct agent with retrieval tool."""
+    """Create ReAct agent with retrieval tool (cached after first call)."""
+    global _agent
+    if _agent is None:
+        _agent = build_agent(
+            model="gpt-4.1",
+            tools=[retrieve_cloud_optimization_info],
+            system_prompt=RAG_PROMPT_TEXT
+        )
     
-    agent = create_agent(
-        model="gpt-4.1",
-        tools=[retrieve_cloud_optimization_info],
-        prompt=rag_prompt.format()
-    )
-    
-    return agent
+    return _agent
 
 
 def query_agent(user_query: str):
@@ -1,18 +1,22 @@
 import os
 import sys
 import json
+import asyncio
+import traceback
 from typing import List, Optional
 from datetime import datetime, timezone
 
 from fastapi import FastAPI, BackgroundTasks
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 import uvicorn
 from dotenv import load_dotenv
+import numpy as np
+import orjson
 
 # Add parent directory to path to import retrieval_pipeline
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from retrieval_pipeline import RetrievalPipeline
 
 # Load environment variables
 load_dotenv()
@@ -55,16 +59,19 @@ class RebuildResponse(BaseModel):
     task_id: Optional[str] = None
 
 
-app = FastAPI(title="Optimization RAG System")
+app = FastAPI(title="Optimization RAG System", default_response_class=ORJSONResponse)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
-retrieval_pipeline = None
 
 def get_pipeline():
-    global retrieval_pipeline
-    if retrieval_pipeline is None:
-        retrieval_pipeline = RetrievalPipeline()
-    return retrieval_pipeline
+    # Imported on first use so the server and /health start without loading models
+    import retrieval_pipeline
+    return retrieval_pipeline.get_pipeline()
+
+
+def is_pipeline_ready() -> bool:
+    retrieval_pipeline = sys.modules.get("retrieval_pipeline")
+    return retrieval_pipeline is not None and retrieval_pipeline.is_pipeline_ready()
 
 
 @app.get("/")
@@ -74,38 +81,43 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    try:
-        get_pipeline()
-        return {"status": "healthy", "pipeline_ready": True}
-    except Exception:
-        return {"status": "degraded", "pipeline_ready": False}
+    return {"status": "healthy", "pipeline_ready": is_pipeline_ready()}
+
+
+def format_results(results, provider_filter: Optional[List[str]]) -> List[QueryResult]:
+    if provider_filter and "string" not in provider_filter:
+        providers = {p.lower() for p in provider_filter}
+        mask = np.fromiter((m['provider'].lower() in providers for m in results.metadatas),
+                           dtype=bool, count=len(results))
+        results = results.take(np.flatnonzero(mask))
+    
+    rerank_scores = results.rerank_scores.tolist() if results.rerank_scores is not None else [None] * len(results)
+    # Results come from our own pipeline, so skip per-field validation
+    return [
+        QueryResult.model_construct(
+            content=content,
+            source=metadata['source'],
+            provider=metadata['provider'],
+            url=metadata['url'],
+            confidence_score=sim_score,
+            rerank_score=rerank_score
+        ) for content, metadata, sim_score, rerank_score in zip(
+            results.contents, results.metadatas, results.sim_scores.tolist(), rerank_scores
+        )
+    ]
 
 
 @app.post("/query", response_model=QueryResponse)
 async def query_optimization(request: QueryRequest):
     start_time = datetime.now(timezone.utc)
-    pipeline = get_pipeline()
+    pipeline = await asyncio.to_thread(get_pipeline)
     
-    results = pipeline.retrieve(request.query, request.top_k, request.use_reranking)
-    
-    if request.provider_filter and "string" not in request.provider_filter:
-        results = [r for r in results if r['metadata']['provider'].lower() in 
-                  [p.lower() for p in request.provider_filter]]
-    
-    formatted_results = [
-        QueryResult(
-            content=result['content'],
-            source=result['metadata']['source'],
-            provider=result['metadata']['provider'],
-            url=result['metadata']['url'],
-            confidence_score=result.get('similarity_score', 0.0),
-            rerank_score=result.get('rerank_score')
-        ) for result in results
-    ]
+    results = await pipeline.aretrieve(request.query, request.top_k, request.use_reranking)
+    formatted_results = format_results(results, request.provider_filter)
     
     processing_time = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
     
-    return QueryResponse(
+    return QueryResponse.model_construct(
         query=request.query,
         results=formatted_results,
         total_results=len(formatted_results),
@@ -113,6 +125,41 @@ async def query_optimization(request: QueryRequest):
     )
 
 
+@app.post("/query/stream")
+async def query_optimization_stream(request: QueryRequest):
+    """
+    Stream results as NDJSON: a vector-search preview line as soon as it is
+    available (when reranking), then the final reranked results. If retrieval
+    fails mid-stream, a final line with stage "error" is sent instead.
+    """
+    start_time = datetime.now(timezone.utc)
+    pipeline = await asyncio.to_thread(get_pipeline)
+    
+    async def stream():
+        try:
+            async for stage, results in pipeline.aretrieve_stream(request.query, request.top_k,
+                                                                  request.use_reranking):
+                formatted_results = format_results(results, request.provider_filter)
+                processing_time = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+                yield orjson.dumps({
+                    "stage": stage,
+                    "query": request.query,
+                    "results": [r.model_dump() for r in formatted_results],
+                    "total_results": len(formatted_results),
+                    "processing_time_ms": round(processing_time, 2),
+                }) + b"\n"
+        except Exception:
+            # The 200 status has already been sent, so report the failure in-band
+            traceback.print_exc()
+            yield orjson.dumps({
+                "stage": "error",
+                "query": request.query,
+                "error": "Retrieval failed",
+            }) + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.get("/stats", response_model=SystemStats)
 async def get_system_stats():
     stats_file = "data/ingestion_stats.json"
@@ -120,7 +167,8 @@ async def get_system_stats():
         with open(stats_file, 'r') as f:
             stats = json.load(f)
     else:
-        stats = {'total_chunks': 0, 'embedding_model': 'text-embedding-3-small', 'provider_breakdown': {}}
+        from retrieval_pipeline import EMBEDDING_MODEL
+        stats = {'total_chunks': 0, 'embedding_model': EMBEDDING_MODEL, 'provider_breakdown': {}}
     
     return SystemStats(
         total_documents=stats.get('total_documents_scraped', 0),
@@ -143,4 +191,18 @@ def rebuild_task(task_id: str):
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Each worker loads its own models and micro-batchers, so one worker batches
+    # best; with more, split the cores between them instead of oversubscribing
+    workers = int(os.getenv("UVICORN_WORKERS", 1))
+    if workers > 1:
+        os.environ.setdefault("MODEL_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+    uvicorn.run(
+        "main:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop="auto",
+        http="auto",
+    )
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent async calls into batches.
+
+    Items submitted within `max_wait_ms` of the first queued item (up to
+    `max_batch_size` items) are handed to `process_batch` together; each
+    caller awaits its own future for the matching result.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_wait_ms: float = 5.0, max_batch_size: int = 256):
+        self.process_batch = process_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = await self.process_batch(items)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,64 @@
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from batching import MicroBatcher
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Sentence-transformers embedding model running in-process.
+
+    Replaces a network round-trip per query with a local forward pass; the
+    model shares the GPU with the reranker when one is available.
+    `query_instruction` is prepended to queries (not documents), as
+    retrieval-tuned models like bge expect.
+    """
+
+    def __init__(self, model_name: str, device: Optional[str] = None, batch_size: int = 64,
+                 query_instruction: str = ""):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.query_instruction = query_instruction
+        self.model = SentenceTransformer(
+            model_name,
+            device=device or ("cuda" if torch.cuda.is_available() else "cpu"),
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([self.query_instruction + text])[0]
+
+
+class BatchingEmbedder:
+    """
+    Coalesces concurrent query embeddings into a single batched request.
+
+    Calls to `aembed_query` arriving within a short window are queued and sent
+    to the underlying model as one `aembed_documents` call, prefixed with the
+    model's `query_instruction` if it has one; each caller awaits its own
+    future for the resulting vector.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_wait_ms: float = 5.0, max_batch_size: int = 256):
+        self.embeddings = embeddings
+        self.query_instruction = getattr(embeddings, "query_instruction", "")
+        self._batcher = MicroBatcher(self._embed_batch, max_wait_ms, max_batch_size)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single query, batched with any concurrent callers."""
+        return await self._batcher.submit(text)
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents([self.query_instruction + text for text in texts])
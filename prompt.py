@@ -1,13 +1,69 @@
 # Create a LANGSMITH_API_KEY in Settings >  API Keys
 import os
+import json
+import time
+import tempfile
+from pathlib import Path
 from dotenv import load_dotenv
 from langsmith import Client
 
 load_dotenv()
 LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
 
+PROMPT_NAME = "rag-prompt"
+# Rendered prompt is cached on disk so startup doesn't wait on LangSmith
+PROMPT_CACHE_FILE = Path(__file__).resolve().parent / ".cache" / "rag_prompt.json"
+PROMPT_CACHE_TTL = 24 * 60 * 60
+
 client = Client(api_key=LANGSMITH_API_KEY)
-rag_prompt = client.pull_prompt("rag-prompt")
+
+
+def _read_prompt_cache():
+    """Return the cached {text, fetched_at} record, or None if it is missing or unreadable."""
+    try:
+        with open(PROMPT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if isinstance(cached['text'], str) and isinstance(cached['fetched_at'], (int, float)):
+            return cached
+    except (OSError, ValueError, TypeError, KeyError):
+        pass
+    return None
+
+
+def _write_prompt_cache(text: str):
+    """Write the cache through a temp file so readers never see a partial record."""
+    tmp_path = None
+    try:
+        PROMPT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=PROMPT_CACHE_FILE.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': time.time(), 'text': text}, f)
+        os.replace(tmp_path, PROMPT_CACHE_FILE)
+    except OSError:
+        # The cache is only an optimization; carry on with the fetched prompt
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_rag_prompt_text() -> str:
+    """Return the rendered RAG prompt, pulling from LangSmith only when the disk cache is stale."""
+    cached = _read_prompt_cache()
+    if cached is not None and time.time() - cached['fetched_at'] < PROMPT_CACHE_TTL:
+        return cached['text']
+    
+    try:
+        text = client.pull_prompt(PROMPT_NAME).format()
+    except Exception:
+        # Fall back to a stale copy rather than failing startup
+        if cached is not None:
+            return cached['text']
+        raise
+    
+    _write_prompt_cache(text)
+    return text
+
+
+RAG_PROMPT_TEXT = load_rag_prompt_text()
 
 
 
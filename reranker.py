@@ -0,0 +1,283 @@
+import os
+import shutil
+import hashlib
+import asyncio
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from filelock import FileLock
+from onnxruntime import SessionOptions
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+from batching import MicroBatcher
+
+# Exported / quantized models are cached here so the export only runs once
+MODELS_DIR = Path(os.getenv("MODELS_DIR", Path(__file__).resolve().parent / "models"))
+QUANTIZED_FILE = "model_quantized.onnx"
+# Written last into a finished export; directories without it are rebuilt
+READY_FILE = ".complete"
+
+
+def _longest_first(n_query: int, n_doc: int, budget: int) -> Tuple[int, int]:
+    """Token counts kept for a pair under the tokenizer's longest_first truncation."""
+    if n_query + n_doc <= budget:
+        return n_query, n_doc
+
+    n_short, n_long = sorted((n_query, n_doc))
+    n_long = n_short if n_short > budget else max(n_short, budget - n_short)
+    if n_short + n_long > budget:
+        n_short = budget // 2
+        n_long = n_short + budget % 2
+
+    return (n_long, n_short) if n_query > n_doc else (n_short, n_long)
+
+
+class BucketedCrossEncoder(ABC):
+    """
+    Base cross-encoder that tokenizes every pair in a single call and scores
+    them in length-sorted mini-batches, so each batch is only padded to its
+    own longest sequence.
+
+    When document ids are passed to `predict`, document token ids are cached
+    per (id, content hash) and only the query side is tokenized for cache
+    hits; hashing the text keeps a reused id from serving stale tokens.
+    """
+
+    return_tensors = "np"
+
+    def __init__(self, model_name: str, max_length: int = 512, batch_size: int = 16,
+                 doc_cache_size: int = 4096):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.doc_cache_size = doc_cache_size
+
+        self._doc_cache: "OrderedDict[Tuple[str, bytes], List[int]]" = OrderedDict()
+        self._doc_cache_lock = threading.Lock()
+
+    @abstractmethod
+    def _forward(self, batch) -> np.ndarray:
+        """Run the model on one padded mini-batch and return float32 logits."""
+
+    def predict(self, pairs: List[Tuple[str, str]], doc_ids: Optional[List[Optional[str]]] = None) -> np.ndarray:
+        """
+        Score (query, document) pairs.
+
+        Args:
+            pairs: List of (query, document) tuples
+            doc_ids: Optional stable id per document, used to cache its tokens
+
+        Returns:
+            Array of relevance logits, one per pair, in input order
+        """
+        if not pairs:
+            return np.empty(0, dtype=np.float32)
+
+        queries, documents = zip(*pairs)
+        if doc_ids is None:
+            features = self.tokenizer(
+                list(queries),
+                list(documents),
+                padding=False,
+                truncation=True,
+                max_length=self.max_length,
+            )
+        else:
+            features = self._encode_cached(queries, documents, doc_ids)
+
+        lengths = np.fromiter((len(ids) for ids in features["input_ids"]), dtype=np.int64, count=len(pairs))
+        order = np.argsort(lengths, kind="stable")
+
+        scores = np.empty(len(pairs), dtype=np.float32)
+        for start in range(0, len(pairs), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad(
+                {key: [values[i] for i in idx] for key, values in features.items()},
+                padding="longest",
+                return_tensors=self.return_tensors,
+            )
+            scores[idx] = self._forward(batch)
+
+        return scores
+
+    def _encode_cached(self, queries, documents, doc_ids) -> Dict[str, List[List[int]]]:
+        """Build [CLS] query [SEP] document [SEP] features from separately tokenized halves."""
+        unique_queries = list(dict.fromkeys(queries))
+        query_tokens = dict(zip(unique_queries, self._tokenize(unique_queries)))
+        doc_tokens = self._document_tokens(documents, doc_ids)
+
+        cls_id, sep_id = self.tokenizer.cls_token_id, self.tokenizer.sep_token_id
+        budget = self.max_length - 3
+        features = {"input_ids": [], "token_type_ids": [], "attention_mask": []}
+        for query, doc in zip(queries, doc_tokens):
+            q = query_tokens[query]
+            n_query, n_doc = _longest_first(len(q), len(doc), budget)
+            features["input_ids"].append([cls_id, *q[:n_query], sep_id, *doc[:n_doc], sep_id])
+            features["token_type_ids"].append([0] * (n_query + 2) + [1] * (n_doc + 1))
+            features["attention_mask"].append([1] * (n_query + n_doc + 3))
+
+        return features
+
+    def _document_tokens(self, documents, doc_ids) -> List[List[int]]:
+        keys = [
+            None if doc_id is None else (doc_id, hashlib.blake2b(doc.encode("utf-8"), digest_size=16).digest())
+            for doc, doc_id in zip(documents, doc_ids)
+        ]
+        tokens: List[Optional[List[int]]] = [None] * len(documents)
+        with self._doc_cache_lock:
+            for i, key in enumerate(keys):
+                if key is not None and key in self._doc_cache:
+                    self._doc_cache.move_to_end(key)
+                    tokens[i] = self._doc_cache[key]
+
+        misses = [i for i, t in enumerate(tokens) if t is None]
+        if misses:
+            for i, ids in zip(misses, self._tokenize([documents[i] for i in misses])):
+                tokens[i] = ids
+
+            with self._doc_cache_lock:
+                for i in misses:
+                    if keys[i] is not None:
+                        self._doc_cache[keys[i]] = tokens[i]
+                while len(self._doc_cache) > self.doc_cache_size:
+                    self._doc_cache.popitem(last=False)
+
+        return tokens
+
+    def _tokenize(self, texts: List[str]) -> List[List[int]]:
+        """Token ids without special tokens; kept whole so truncation matches the pair tokenizer."""
+        return self.tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+
+
+class TorchCrossEncoder(BucketedCrossEncoder):
+    """
+    Cross-encoder reranker running the PyTorch checkpoint (used on GPU).
+
+    Weights are loaded natively in bfloat16 when the GPU supports it; logits
+    are upcast to float32 before leaving the model. On GPU, forwards run on a
+    dedicated CUDA stream rather than the default one.
+    """
+
+    return_tensors = "pt"
+
+    def __init__(self, model_name: str, device: str = "cpu", max_length: int = 512, batch_size: int = 16,
+                 doc_cache_size: int = 4096):
+        super().__init__(model_name, max_length=max_length, batch_size=batch_size, doc_cache_size=doc_cache_size)
+        self.device = device
+        self.dtype = torch.bfloat16 if device == "cuda" and torch.cuda.is_bf16_supported() else torch.float32
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = (
+            AutoModelForSequenceClassification.from_pretrained(model_name, dtype=self.dtype)
+            .to(device)
+            .eval()
+        )
+        self.stream = torch.cuda.Stream() if device == "cuda" else None
+
+    def _forward(self, batch) -> np.ndarray:
+        if self.stream is None:
+            return self._run_model(batch)
+        with torch.cuda.stream(self.stream):
+            return self._run_model(batch)
+
+    def _run_model(self, batch) -> np.ndarray:
+        with torch.inference_mode():
+            batch = {key: tensor.to(self.device, non_blocking=True) for key, tensor in batch.items()}
+            logits = self.model(**batch).logits
+        return logits[:, 0].float().cpu().numpy()
+
+
+class QuantizedCrossEncoder(BucketedCrossEncoder):
+    """
+    Cross-encoder reranker running as an INT8 ONNX Runtime model.
+
+    The Hugging Face checkpoint is exported to ONNX and dynamically quantized
+    on first use; later starts load the cached quantized model from disk.
+    `num_threads` caps ONNX Runtime's intra-op thread pool (default: all cores).
+    """
+
+    def __init__(self, model_name: str, max_length: int = 512, batch_size: int = 16,
+                 doc_cache_size: int = 4096, num_threads: Optional[int] = None):
+        super().__init__(model_name, max_length=max_length, batch_size=batch_size, doc_cache_size=doc_cache_size)
+
+        session_options = SessionOptions()
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+
+        model_dir = self._ensure_quantized(model_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForSequenceClassification.from_pretrained(
+            model_dir, file_name=QUANTIZED_FILE, session_options=session_options
+        )
+
+    @staticmethod
+    def _ensure_quantized(model_name: str) -> Path:
+        """
+        Export and quantize the model unless a complete cached copy exists.
+
+        The build runs in a temporary directory that is moved into place once
+        finished, under a file lock so concurrent workers export it only once.
+        """
+        slug = model_name.replace("/", "__")
+        quantized_dir = MODELS_DIR / f"{slug}-int8"
+        if (quantized_dir / READY_FILE).exists():
+            return quantized_dir
+
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        with FileLock(str(MODELS_DIR / f"{slug}.lock")):
+            if (quantized_dir / READY_FILE).exists():
+                return quantized_dir
+
+            print(f"Exporting {model_name} to ONNX and quantizing to INT8...")
+            with tempfile.TemporaryDirectory(dir=MODELS_DIR, prefix=f".{slug}-") as tmp:
+                onnx_dir = Path(tmp) / "onnx"
+                build_dir = Path(tmp) / "int8"
+                ORTModelForSequenceClassification.from_pretrained(model_name, export=True).save_pretrained(onnx_dir)
+
+                quantizer = ORTQuantizer.from_pretrained(onnx_dir)
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+                quantizer.quantize(save_dir=build_dir, quantization_config=qconfig)
+                AutoTokenizer.from_pretrained(model_name).save_pretrained(build_dir)
+                (build_dir / READY_FILE).touch()
+
+                # Drop any partial output left by an interrupted build before swapping in
+                shutil.rmtree(quantized_dir, ignore_errors=True)
+                os.replace(build_dir, quantized_dir)
+
+        return quantized_dir
+
+    def _forward(self, batch) -> np.ndarray:
+        logits = self.model(**batch).logits
+        return np.asarray(logits, dtype=np.float32)[:, 0]
+
+
+class RerankBatcher:
+    """
+    Server-side micro-batching for the reranker.
+
+    Rerank requests from concurrent callers that arrive within a short window
+    are concatenated into one `predict` call (run in a worker thread), and the
+    scores are split back per request.
+    """
+
+    def __init__(self, model: BucketedCrossEncoder, max_wait_ms: float = 5.0, max_batch_size: int = 32):
+        self.model = model
+        self._batcher = MicroBatcher(self._score_batch, max_wait_ms, max_batch_size)
+
+    async def apredict(self, pairs: List[Tuple[str, str]], doc_ids: Optional[List[Optional[str]]] = None) -> np.ndarray:
+        """Score (query, document) pairs, batched with any concurrent callers."""
+        return await self._batcher.submit((pairs, doc_ids or [None] * len(pairs)))
+
+    async def _score_batch(self, requests) -> List[np.ndarray]:
+        all_pairs = [pair for pairs, _ in requests for pair in pairs]
+        all_doc_ids = [doc_id for _, doc_ids in requests for doc_id in doc_ids]
+        scores = await asyncio.to_thread(self.model.predict, all_pairs, all_doc_ids)
+        offsets = np.cumsum([len(pairs) for pairs, _ in requests])[:-1]
+        return np.split(scores, offsets)
@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class _CacheEntry:
+    slot: int
+    params: tuple
+    results: Any
+    expires_at: float
+
+
+class SemanticCache:
+    """
+    In-process retrieval cache keyed on the query text and its embedding.
+
+    Exact repeats are answered from a SHA-256 keyed LRU; near-duplicates are
+    answered when the cosine similarity of their embeddings to a cached query
+    reaches `threshold`. `params` (e.g. top_k, use_reranking) must match for
+    a hit. Entries expire after `ttl_seconds`.
+    """
+
+    def __init__(self, threshold: float = 0.97, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._slot_keys: List[Optional[str]] = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._vectors: Optional[np.ndarray] = None
+        self._active = np.zeros(max_entries, dtype=bool)
+
+    @staticmethod
+    def _key(query: str, params: tuple) -> str:
+        return hashlib.sha256(f"{params!r}\x00{query}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, params: tuple) -> Optional[Any]:
+        """Return cached results for an exact query string, if any."""
+        key = self._key(query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.results
+
+    def get_similar(self, embedding: Sequence[float], params: tuple) -> Optional[Any]:
+        """Return cached results for the closest query above the similarity threshold."""
+        with self._lock:
+            if self._vectors is None or not self._active.any():
+                return None
+
+            query = self._normalize(embedding)
+            if query.shape[0] != self._vectors.shape[1]:
+                return None
+
+            sims = self._vectors @ query
+            sims[~self._active] = -np.inf
+
+            now = time.monotonic()
+            hits = np.flatnonzero(sims >= self.threshold)
+            for slot in hits[np.argsort(-sims[hits])]:
+                key = self._slot_keys[slot]
+                entry = self._entries[key]
+                if entry.expires_at < now:
+                    self._evict(key)
+                    continue
+                if entry.params == params:
+                    self._entries.move_to_end(key)
+                    return entry.results
+
+            return None
+
+    def put(self, query: str, embedding: Sequence[float], params: tuple, results: Any):
+        """Store results for a query and its embedding."""
+        key = self._key(query, params)
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._reset(vector.shape[0])
+
+            if key in self._entries:
+                self._evict(key)
+            if not self._free_slots:
+                self._evict(next(iter(self._entries)))
+
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._active[slot] = True
+            self._slot_keys[slot] = key
+            self._entries[key] = _CacheEntry(
+                slot=slot,
+                params=params,
+                results=results,
+                expires_at=time.monotonic() + self.ttl_seconds,
+            )
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._reset(self._vectors.shape[1] if self._vectors is not None else 0)
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key)
+        self._active[entry.slot] = False
+        self._slot_keys[entry.slot] = None
+        self._free_slots.append(entry.slot)
+
+    def _reset(self, dim: int):
+        self._entries.clear()
+        self._slot_keys = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._active[:] = False
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
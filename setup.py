@@ -12,6 +12,7 @@ setup(
         "beautifulsoup4==4.14.2",
         "bs4==0.0.2",
         "fastapi==0.120.0",
+        "filelock==3.19.1",
         "huggingface-hub==0.36.0",
         "ipykernel==7.0.1",
         "ipython==9.6.0",
@@ -33,6 +34,8 @@ setup(
         "nest-asyncio==1.6.0",
         "networkx==3.5",
         "openai==2.6.1",
+        "optimum-onnx[onnxruntime]==0.1.0",
+        "orjson==3.11.3",
         "packaging==25.0",
         "pgvector==0.3.6",
         "prompt_toolkit==3.0.52",
@@ -49,6 +52,6 @@ setup(
         "tiktoken==0.12.0",
         "tokenizers==0.22.1",
         "transformers==4.57.1",
-        "uvicorn==0.38.0",
+        "uvicorn[standard]==0.38.0",
     ],
 )
@@ -9,14 +9,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
-from retrieval_pipeline import RetrievalPipeline
-from prompt import rag_prompt
+from retrieval_pipeline import get_pipeline
+from prompt import RAG_PROMPT_TEXT
 
 load_dotenv()
 
-# Initialize retrieval pipeline - EXACT copy from your agent_orchestrator.py
-retrieval_pipeline = RetrievalPipeline()
-
 # EXACT copy of your tool from agent_orchestrator.py
 @tool
 def retrieve_cloud_optimization_info(query: Annotated[str, "The cloud cost optimization question"]) -> str:
@@ -30,13 +27,13 @@ def retrieve_cloud_optimization_info(query: Annotated[str, "The cloud cost optim
     - Cost reduction strategies
     - FinOps best practices
     """
-    results = retrieval_pipeline.retrieve(query, top_k=3)
+    results = get_pipeline().retrieve(query, top_k=3, use_reranking=False)
     
     context_parts = []
-    for i, result in enumerate(results, 1):
-        source = result['metadata']['source']
-        provider = result['metadata']['provider']
-        content = result['content'][:500]
+    for i, (content, metadata) in enumerate(zip(results.contents, results.metadatas), 1):
+        source = metadata['source']
+        provider = metadata['provider']
+        content = content[:500]
         context_parts.append(f"[Source {i}: {source} - {provider}]\n{content}")
     
     return "\n\n".join(context_parts)
@@ -52,7 +49,7 @@ model = ChatOpenAI(
 graph = create_react_agent(
     model=model,
     tools=[retrieve_cloud_optimization_info],
-    prompt=rag_prompt.format()
+    prompt=RAG_PROMPT_TEXT
 )
 
 # Add metadata for LangSmith
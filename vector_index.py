@@ -0,0 +1,157 @@
+"""
+HNSW index and search SQL for the PGVector collection (requires pgvector >= 0.7).
+
+Search runs in two stages. A shortlist is fetched by Hamming distance over
+binary-quantized embeddings (`binary_quantize(embedding)::bit(dim)`, 1 bit per
+dimension) through an HNSW index, then rescored with exact cosine distance on
+the full-precision vectors. Queries must use the same expression as the index
+so the planner picks it.
+
+Run this module once after ingesting documents to build the index; pass
+`--reembed` to first recompute every stored embedding with the local
+embedding model (needed after ingesting with a different model):
+
+    python vector_index.py [--reembed]
+"""
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+HNSW_INDEX_NAME = "langchain_pg_embedding_hnsw_bit"
+LEGACY_INDEX_NAMES = ["langchain_pg_embedding_hnsw_halfvec"]
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+# Binary first stage shortlist size; HNSW returns at most ef_search rows
+SHORTLIST_K = 200
+HNSW_EF_SEARCH = SHORTLIST_K
+
+
+def create_hnsw_index(engine: Engine, dim: int):
+    """Create the binary HNSW Hamming index on the embedding table, replacing older indexes."""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        for name in LEGACY_INDEX_NAMES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {HNSW_INDEX_NAME} "
+            f"ON langchain_pg_embedding "
+            f"USING hnsw ((binary_quantize(embedding)::bit({dim})) bit_hamming_ops) "
+            f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        ))
+
+
+def drop_hnsw_indexes(engine: Engine):
+    """Drop the search index (and any older ones), e.g. before changing embedding dimensions."""
+    with engine.begin() as conn:
+        for name in [HNSW_INDEX_NAME, *LEGACY_INDEX_NAMES]:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def reembed_collection(engine: Engine, embeddings: Embeddings, collection_id: str, batch_size: int = 128) -> int:
+    """
+    Recompute every stored embedding in a collection.
+
+    Args:
+        engine: SQLAlchemy engine for the vector database
+        embeddings: Embedding model to encode the stored documents with
+        collection_id: UUID of the collection to update
+        batch_size: Number of documents encoded per forward pass
+
+    Returns:
+        Number of rows updated
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT id, document FROM langchain_pg_embedding WHERE collection_id = :collection_id"),
+            {"collection_id": collection_id},
+        ).all()
+
+    update = text("UPDATE langchain_pg_embedding SET embedding = CAST(:embedding AS vector) WHERE id = :id")
+    with engine.begin() as conn:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            vectors = embeddings.embed_documents([document for _, document in batch])
+            conn.execute(update, [
+                {"id": row_id, "embedding": to_pgvector(vector)}
+                for (row_id, _), vector in zip(batch, vectors)
+            ])
+
+    return len(rows)
+
+
+def get_collection_id(engine: Engine, collection_name: str) -> Optional[str]:
+    """Look up the UUID of a langchain-postgres collection by name."""
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+            {"name": collection_name},
+        ).scalar()
+
+
+def search_sql(dim: int):
+    """
+    Top-k cosine search over one collection.
+
+    Fetches `:shortlist_k` rows by Hamming distance on the binary index, then
+    rescores them with exact cosine distance and keeps the best `:k`. The
+    collection is resolved by `:collection_name` on every query, so a
+    recreated collection (new UUID) is picked up without a restart.
+    """
+    query = f"CAST(:embedding AS vector({dim}))"
+    return text(
+        f"SELECT document, cmetadata, embedding <=> {query} AS distance "
+        f"FROM ("
+        f"SELECT document, cmetadata, embedding "
+        f"FROM langchain_pg_embedding "
+        f"WHERE collection_id = ("
+        f"SELECT uuid FROM langchain_pg_collection WHERE name = :collection_name"
+        f") "
+        f"ORDER BY binary_quantize(embedding)::bit({dim}) <~> binary_quantize({query}) "
+        f"LIMIT :shortlist_k"
+        f") AS shortlist "
+        f"ORDER BY distance "
+        f"LIMIT :k"
+    )
+
+
+def session_options(ef_search: int = HNSW_EF_SEARCH) -> str:
+    """libpq startup options that set the HNSW candidate list size for every session."""
+    return f"-c hnsw.ef_search={int(ef_search)}"
+
+
+def to_pgvector(embedding: List[float]) -> str:
+    """Format an embedding as a pgvector text literal."""
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+    from retrieval_pipeline import COLLECTION_NAME, CONNECTION, EMBEDDING_DIM, EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Build the vector search index")
+    parser.add_argument("--reembed", action="store_true",
+                        help=f"re-embed the collection with {EMBEDDING_MODEL} first")
+    args = parser.parse_args()
+
+    engine = create_engine(CONNECTION)
+
+    if args.reembed:
+        from embeddings import LocalEmbeddings
+
+        collection_id = get_collection_id(engine, COLLECTION_NAME)
+        if collection_id is None:
+            raise SystemExit(f"Collection {COLLECTION_NAME!r} not found; run the ingestion notebook first.")
+
+        drop_hnsw_indexes(engine)
+        print(f"Re-embedding {COLLECTION_NAME} with {EMBEDDING_MODEL}...")
+        updated = reembed_collection(engine, LocalEmbeddings(EMBEDDING_MODEL), collection_id)
+        print(f"Updated {updated} embeddings.")
+
+    print(f"Creating HNSW index {HNSW_INDEX_NAME} (dim={EMBEDDING_DIM})...")
+    create_hnsw_index(engine, EMBEDDING_DIM)
+    print("Done.")